@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Shared client for the UK Parliament Members API
+"""
+
+import requests
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import csv
+import gzip
+import logging
+import os
+import random
+import time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import chain
+from typing import Any
+from rate_limit import TokenBucket, retry_after
+from names import split_name
+
+# orjson decodes API responses noticeably faster; fall back to the stdlib
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    import json
+    from json import loads as json_loads  # type: ignore[assignment]
+    
+    def json_dumps(obj: Any) -> bytes:  # type: ignore[misc]
+        return json.dumps(obj).encode('utf-8')
+
+logger = logging.getLogger(__name__)
+
+# Number of requests in flight at once; also the size of the connection pool
+MAX_WORKERS = 8
+
+# Per-member endpoints, filled in with the member ID. Endpoints are appended
+# straight to base_url, so there's no URL parsing per request
+MEMBER_ENDPOINT = '/api/Members/{}'.format
+CONTACT_ENDPOINT = '/api/Members/{}/Contact'.format
+
+# Public contact page for a member, filled in with their ID
+CONTACT_URL = 'https://members.parliament.uk/member/{}/contact'.format
+
+# CSVs are read and written sequentially, so use a 1 MiB buffer rather than
+# the 8 KiB default to cut down on read()/write() calls
+BUFFER_SIZE = 1 << 20
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+    'Accept-Language': 'en-GB,en;q=0.9'
+}
+
+# Cache records are plain tuples in these column orders, written with
+# csv.writer rather than as dicts through csv.DictWriter
+MP_FIELDNAMES = ('member_id', 'full_name', 'first_name', 'last_name', 'constituency_name', 'party')
+LORD_FIELDNAMES = ('member_id', 'full_name', 'first_name', 'last_name', 'membership_type', 'membership_from', 'party')
+
+def _lookup(data: Any, *path: str) -> Any:
+    """Follow path through nested API dicts, returning '' if any step is missing"""
+    try:
+        for key in path:
+            data = data[key]
+    except (KeyError, TypeError):
+        return ''
+    return data
+
+def record_from_mp(mp: dict[str, Any]) -> tuple[Any, ...]:
+    """Build an MP cache record (in MP_FIELDNAMES order) from a members search result"""
+    full_name: str = mp.get('nameDisplayAs', '')
+    first_name, last_name = split_name(full_name)
+    
+    return (
+        mp.get('id'),
+        full_name,
+        first_name,
+        last_name,
+        _lookup(mp, 'latestHouseMembership', 'membershipFrom'),
+        _lookup(mp, 'latestParty', 'name')
+    )
+
+def record_from_lord(lord: dict[str, Any]) -> tuple[Any, ...]:
+    """Build a Lord cache record (in LORD_FIELDNAMES order) from a members search result"""
+    full_name: str = lord.get('nameDisplayAs', '')
+    first_name, last_name = split_name(full_name)
+    
+    # Lords don't have constituencies, they have membership types
+    return (
+        lord.get('id'),
+        full_name,
+        first_name,
+        last_name,
+        _lookup(lord, 'latestHouseMembership', 'membershipFromDescription'),
+        _lookup(lord, 'latestHouseMembership', 'membershipFrom'),
+        _lookup(lord, 'latestParty', 'name')
+    )
+
+def copy_fields(*pairs):
+    """Contact handler copying each (contact field, contact_info key) pair that is set into contact_info
+    
+    The scrapers key their handler tables by lower-cased contact type, so
+    casing variants from the API still match
+    """
+    def handler(contact, contact_info):
+        for field, key in pairs:
+            if contact.get(field):
+                contact_info[key] = contact[field]
+    return handler
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that takes a token from the limiter before each request"""
+    
+    def __init__(self, limiter, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+    
+    def send(self, request, **kwargs):
+        # Only requests that reach the adapter hit the network, so responses
+        # served from the HTTP cache never wait on the limiter
+        self.limiter.acquire()
+        return super().send(request, **kwargs)
+
+class MembersAPI:
+    def __init__(self, house=None, max_workers=MAX_WORKERS, cache_name=None, refresh=False):
+        self.house = house  # 'Commons' or 'Lords', used by the members search
+        self.max_workers = max_workers
+        self.refresh = refresh
+        # Endpoints already start with /api/, so URLs are just base_url + endpoint
+        self.base_url = "https://members-api.parliament.uk"
+        
+        # Optionally keep successful GETs in an on-disk cache for a day, so
+        # re-runs don't re-fetch details that rarely change
+        if cache_name:
+            self.session = requests_cache.CachedSession(
+                cache_name,
+                backend='sqlite',
+                expire_after=timedelta(days=1),
+                allowable_codes=(200,),
+                allowable_methods=('GET',)
+            )
+        else:
+            self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        
+        # Reuse connections across requests and let urllib3 retry connection
+        # errors and 5xx with jittered exponential backoff. urllib3 would also
+        # retry any 429 carrying a Retry-After header (bypassing the limiter
+        # and sleeping however long the header says), so Retry-After is
+        # ignored here and 429s are left to get_api_data. backoff_max and
+        # backoff_jitter need urllib3 2
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            backoff_max=30,
+            backoff_jitter=0.5,
+            status_forcelist=[500, 502, 503, 504],
+            respect_retry_after_header=False
+        )
+        
+        # Shared by all requests (and worker threads) made by this client
+        self.limiter = TokenBucket(rate=8, capacity=16)
+        
+        # Size the pool to the worker count and block rather than open
+        # throwaway connections, so every worker keeps one warm keep-alive
+        # connection for the whole run
+        adapter = RateLimitedAdapter(
+            self.limiter,
+            pool_connections=32,
+            pool_maxsize=max_workers,
+            pool_block=True,
+            max_retries=retry
+        )
+        self.session.mount('https://', adapter)
+    
+    def get_api_data(self, endpoint, params=None, retries=3):
+        """Get data from API with rate limiting and error handling"""
+        url = self.base_url + endpoint
+        
+        # Bypass (and overwrite) cached responses when refreshing; a plain
+        # session has no cache and doesn't accept force_refresh
+        if self.refresh and isinstance(self.session, requests_cache.CachedSession):
+            kwargs = {'force_refresh': True}
+        else:
+            kwargs = {}
+        
+        for attempt in range(retries):
+            try:
+                response = self.session.get(url, params=params, timeout=15, **kwargs)
+            except requests.RequestException as e:
+                logger.warning("Error fetching %s: %s", url, e)
+                return None
+            
+            if response.status_code == 200:
+                # Cached responses say nothing about the server's current limit
+                if not getattr(response, 'from_cache', False):
+                    self.limiter.record_success()
+                return json_loads(response.content)
+            
+            if response.status_code == 429:  # Rate limited
+                self.limiter.shrink(0.5)
+                if attempt == retries - 1:
+                    logger.warning("Rate limited, giving up on %s", url)
+                    return None
+                
+                wait = retry_after(response)
+                logger.warning("Rate limited, waiting %.0f seconds...", wait)
+                # Jitter so the worker threads don't all retry at once
+                time.sleep(wait + random.uniform(0, 1))
+                continue
+            
+            logger.warning("API returned status %d for %s", response.status_code, url)
+            return None
+        
+        return None
+    
+    def get_search_page(self, skip, take):
+        """Get one page of current members of the house from the search endpoint"""
+        params = {
+            'House': self.house,
+            'IsEligible': 'true',
+            'IsCurrentMember': 'true',
+            'skip': skip,
+            'take': take
+        }
+        return self.get_api_data('/api/Members/Search', params)
+    
+    def _paginate(self, take=20):
+        """Yield currently active members of the house, page by page as they arrive
+        
+        Afterwards self.search_complete says whether every search result was fetched
+        """
+        self.search_complete = False
+        count = 0
+        fetched = 0
+        
+        # The first page tells us how many results there are, so the
+        # remaining pages can be fetched concurrently
+        first_page = self.get_search_page(0, take)
+        if not first_page or 'items' not in first_page:
+            print("Could not fetch the first page of search results")
+            return
+        
+        # Without the total we can't tell which pages are missing, so don't
+        # pass the first page off as the whole result set
+        total = first_page.get('totalResults')
+        if not isinstance(total, int):
+            print("Search results have no totalResults, can't tell whether the cache would be complete")
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            other_pages = executor.map(lambda skip: self.get_search_page(skip, take), range(take, total, take))
+            
+            for data in chain([first_page], other_pages):
+                if not data or 'items' not in data:
+                    continue
+                fetched += len(data['items'])
+                
+                # The search only returns current members, but that includes
+                # those who are inactive (e.g. Lords on leave of absence)
+                member_items = []
+                for item in data['items']:
+                    try:
+                        member = item['value']
+                        active = member['latestHouseMembership']['membershipStatus']['statusIsActive']
+                    except (KeyError, TypeError):
+                        continue
+                    
+                    if active == True:
+                        member_items.append(member)
+                
+                count += len(member_items)
+                print(f"Retrieved {len(member_items)} current members (total so far: {count})")
+                yield from member_items
+        
+        # Pages that failed are skipped above, so flag the results as incomplete
+        # rather than let them silently truncate the cache
+        if fetched < total:
+            print(f"Warning: only retrieved {fetched} of {total} search results")
+        else:
+            self.search_complete = True
+    
+    def cache_to_csv(self, cache_file, fieldnames, record_from_member, raw_file=None):
+        """Stream the current members of the house into a CSV cache, returning the count
+        
+        If raw_file is given, the search results are also kept there as gzipped
+        NDJSON so the cache can be rebuilt later with cache_from_raw
+        """
+        count = 0
+        
+        # Write to temporary files and only replace the real ones once every
+        # page has come back, so a failed run keeps the last good cache (and
+        # raw results to rebuild it from)
+        tmp_cache_file = cache_file + '.tmp'
+        tmp_raw_file = raw_file + '.tmp' if raw_file else None
+        try:
+            with open(tmp_cache_file, 'w', newline='', encoding='utf-8', buffering=BUFFER_SIZE) as csvfile, \
+                 (gzip.open(tmp_raw_file, 'wb') if tmp_raw_file else nullcontext()) as rawfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(fieldnames)
+                for member in self._paginate():
+                    writer.writerow(record_from_member(member))
+                    if rawfile:
+                        rawfile.write(json_dumps(member) + b'\n')
+                    count += 1
+            
+            if not self.search_complete:
+                print(f"Search incomplete, keeping the previous {cache_file}")
+                return 0
+            
+            os.replace(tmp_cache_file, cache_file)
+            if tmp_raw_file:
+                os.replace(tmp_raw_file, raw_file)
+        finally:
+            for tmp_file in (tmp_cache_file, tmp_raw_file):
+                if tmp_file and os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+        
+        print(f"Cached {count} members to {cache_file}")
+        return count
+    
+    def cache_from_raw(self, raw_file, cache_file, fieldnames, record_from_member):
+        """Rebuild a CSV cache from raw search results saved by cache_to_csv, without the API"""
+        if not os.path.exists(raw_file):
+            print(f"Raw file {raw_file} not found. Cache from the API first.")
+            return 0
+        
+        count = 0
+        
+        with gzip.open(raw_file, 'rb') as rawfile, \
+             open(cache_file, 'w', newline='', encoding='utf-8', buffering=BUFFER_SIZE) as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
+            for line in rawfile:
+                writer.writerow(record_from_member(json_loads(line)))
+                count += 1
+        
+        print(f"Rebuilt {count} members from {raw_file} into {cache_file}")
+        return count
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Split member display names into first and last names
+"""
+
+import re
+
+TITLES = (
+    'The Rt Hon ', 'Rt Hon ', 'Sir ', 'Dame ', 'Dr ', 'Mr ', 'Ms ', 'Mrs ', 'Miss ',
+    'Lord ', 'Lady ', 'Baroness ', 'Baron ', 'Earl ', 'Countess ', 'Viscount ', 'Viscountess ',
+    'Duke ', 'Duchess ', 'Marquess ', 'Marchioness ', 'Rev ', 'Revd ', 'Father ', 'Mother ',
+    'Professor ', 'Prof ', 'Colonel ', 'Major ', 'Captain ', 'Lieutenant ', 'Admiral ',
+    'General ', 'Air Marshal ', 'Group Captain ', 'Wing Commander ', 'Squadron Leader '
+)
+
+# Longest first so e.g. 'Viscountess ' wins over 'Viscount '; the group repeats
+# so stacked titles like 'The Rt Hon Sir ' are stripped in one pass
+_TITLE_RE = re.compile(
+    '^(?:(?:' + '|'.join(re.escape(t) for t in sorted(TITLES, key=len, reverse=True)) + r')\s*)+'
+)
+
+def split_name(full_name):
+    """Split full name into first and last name, removing titles"""
+    name = _TITLE_RE.sub('', full_name.strip())
+    first_name, _, last_name = name.partition(' ')
+    return first_name.strip(), last_name.strip()
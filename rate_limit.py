@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Token-bucket rate limiting shared by the Members API clients
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+class TokenBucket:
+    def __init__(self, rate=8, capacity=16, min_rate=0.5, window=20):
+        self.rate = rate  # tokens added per second
+        self.max_rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        # Successes since the last 429; the rate only grows back once a full
+        # window of them has been seen, so it doesn't flap around the limit
+        self.window = window
+        self.successes = 0
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.last_shrink = 0.0
+        self.lock = threading.Lock()
+    
+    def _refill(self):
+        """Top up the bucket for the time elapsed since the last refill"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+    
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+    
+    def shrink(self, factor=0.5):
+        """Slow down after the server pushes back with a 429"""
+        with self.lock:
+            # Concurrent requests tend to hit the same 429 window together,
+            # so only count it once per second
+            now = time.monotonic()
+            if now - self.last_shrink < 1:
+                return
+            self.last_shrink = now
+            
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * factor)
+            self.tokens = 0
+            self.successes = 0
+    
+    def record_success(self, step=1):
+        """Creep back towards the starting rate after a run of successful requests"""
+        with self.lock:
+            if self.rate >= self.max_rate:
+                return
+            
+            self.successes += 1
+            if self.successes >= self.window:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + step)
+                self.successes = 0
+
+def retry_after(response, default=30, min_wait=1, max_wait=60):
+    """Seconds to wait before retrying, taken from the Retry-After header
+    
+    The header may be a number of seconds or an HTTP date; either way the
+    wait is clamped to [min_wait, max_wait]
+    """
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return default
+    
+    try:
+        wait = float(value)
+    except ValueError:
+        try:
+            wait = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return default
+    
+    return min(max_wait, max(min_wait, wait))
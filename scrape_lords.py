@@ -3,50 +3,37 @@
 Scrape contact details for Lords using the cached list
 """
 
-import requests
 import csv
-import time
+import logging
 import sys
 import os
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from members_api import MembersAPI, MAX_WORKERS, MEMBER_ENDPOINT, CONTACT_ENDPOINT, CONTACT_URL, copy_fields
 
-class LordsContactScraper:
-    def __init__(self):
-        self.base_url = "https://members-api.parliament.uk/api"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json',
-            'Accept-Language': 'en-GB,en;q=0.9'
-        })
-    
-    def get_api_data(self, endpoint, retries=3):
-        """Get data from API with retries and error handling"""
-        url = urljoin(self.base_url, endpoint)
-        
-        for attempt in range(retries):
-            try:
-                response = self.session.get(url, timeout=15)
-                
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 429:  # Rate limited
-                    print(f"Rate limited, waiting 30 seconds...")
-                    time.sleep(30)
-                    continue
-                else:
-                    print(f"API returned status {response.status_code} for {url}")
-                    if attempt < retries - 1:
-                        time.sleep(2)
-                        continue
-                    return None
-                    
-            except requests.RequestException as e:
-                print(f"Error fetching {url} (attempt {attempt + 1}): {e}")
-                if attempt < retries - 1:
-                    time.sleep(3)
-                else:
-                    return None
+FIELDNAMES = (
+    'member_id', 'contact_url', 'full_name', 'full_title', 'first_name', 'last_name',
+    'membership_type', 'membership_from', 'membership_start_date', 'party', 'gender',
+    'parliament_email', 'phone', 'fax', 'address_line1', 'address_line2', 'postcode',
+    'website', 'facebook', 'twitter', 'is_active'
+)
+
+# Contact handlers keyed by the API's contact type, lower-cased so casing
+# variants still match. Lords typically only have a Parliamentary office;
+# websites and social media (kept in line1) are rare
+CONTACT_HANDLERS = {
+    'parliamentary office': copy_fields(
+        ('email', 'parliament_email'), ('phone', 'phone'), ('fax', 'fax'),
+        ('line1', 'address_line1'), ('line2', 'address_line2'), ('postcode', 'postcode')
+    ),
+    'website': copy_fields(('line1', 'website')),
+    'facebook': copy_fields(('line1', 'facebook')),
+    'twitter': copy_fields(('line1', 'twitter')),
+    'x (formerly twitter)': copy_fields(('line1', 'twitter'))
+}
+
+class LordsContactScraper(MembersAPI):
+    def __init__(self, max_workers=MAX_WORKERS, refresh=False):
+        super().__init__(max_workers=max_workers, cache_name='lords_http_cache', refresh=refresh)
     
     def extract_contact_info(self, contact_data):
         """Extract contact information from API response for Lords"""
@@ -72,36 +59,10 @@ class LordsContactScraper:
         for contact in contacts:
             if not isinstance(contact, dict):
                 continue
-                
-            contact_type = contact.get('type', '').lower()
-            
-            # Lords typically only have Parliamentary office
-            if 'parliamentary office' in contact_type:
-                if contact.get('email'):
-                    contact_info['parliament_email'] = contact['email']
-                if contact.get('phone'):
-                    contact_info['phone'] = contact['phone']
-                if contact.get('fax'):
-                    contact_info['fax'] = contact['fax']
-                if contact.get('line1'):
-                    contact_info['address_line1'] = contact['line1']
-                if contact.get('line2'):
-                    contact_info['address_line2'] = contact['line2']
-                if contact.get('postcode'):
-                    contact_info['postcode'] = contact['postcode']
             
-            # Check for any website or social media (though rare for Lords)
-            elif 'website' in contact_type:
-                if contact.get('line1'):
-                    contact_info['website'] = contact['line1']
-            
-            elif 'facebook' in contact_type:
-                if contact.get('line1'):
-                    contact_info['facebook'] = contact['line1']
-            
-            elif 'twitter' in contact_type or 'x (formerly twitter)' in contact_type:
-                if contact.get('line1'):
-                    contact_info['twitter'] = contact['line1']
+            handler = CONTACT_HANDLERS.get(contact.get('type', '').lower())
+            if handler:
+                handler(contact, contact_info)
         
         return contact_info
     
@@ -153,6 +114,51 @@ class LordsContactScraper:
         print(f"Loaded {len(lords)} Lords from cache")
         return lords
     
+    def load_done_ids(self, csv_file):
+        """Get the member IDs already written to an output CSV"""
+        with open(csv_file, 'r', encoding='utf-8') as csvfile:
+            return {row['member_id'] for row in csv.DictReader(csvfile)}
+    
+    def drop_rows(self, csv_file, member_ids):
+        """Rewrite an output CSV without the rows for the given member IDs"""
+        with open(csv_file, 'r', encoding='utf-8') as csvfile:
+            rows = [row for row in csv.DictReader(csvfile) if row['member_id'] not in member_ids]
+        
+        with open(csv_file, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
+    
+    def build_result(self, lord, contact_data, member_data):
+        """Build the result row for a cached Lord from their contact and member API responses"""
+        member_id = lord['member_id']
+        contact_info = self.extract_contact_info(contact_data)
+        member_details = self.extract_member_details(member_data)
+        
+        return {
+            'member_id': member_id,
+            'contact_url': CONTACT_URL(member_id),
+            'full_name': lord['full_name'],
+            'full_title': member_details['full_title'],
+            'first_name': lord['first_name'],
+            'last_name': lord['last_name'],
+            'membership_type': member_details['membership_type'] or lord.get('membership_type', ''),
+            'membership_from': lord.get('membership_from', ''),
+            'membership_start_date': member_details['membership_start_date'],
+            'party': lord['party'],
+            'gender': member_details['gender'],
+            'parliament_email': contact_info.get('parliament_email', ''),
+            'phone': contact_info.get('phone', ''),
+            'fax': contact_info.get('fax', ''),
+            'address_line1': contact_info.get('address_line1', ''),
+            'address_line2': contact_info.get('address_line2', ''),
+            'postcode': contact_info.get('postcode', ''),
+            'website': contact_info.get('website', ''),
+            'facebook': contact_info.get('facebook', ''),
+            'twitter': contact_info.get('twitter', ''),
+            'is_active': member_details['is_active']
+        }
+    
     def scrape_contacts(self, start_index=0, max_lords=None):
         """Scrape contact details for cached Lords"""
         lords = self.load_cached_lords()
@@ -164,121 +170,119 @@ class LordsContactScraper:
         else:
             lords = lords[start_index:]
         
-        print(f"Scraping contact details for {len(lords)} Lords starting from index {start_index}...")
-        
-        # Initialize the CSV file with headers (or append if continuing)
         csv_file = 'uk_lords_complete.csv'
-        fieldnames = [
-            'member_id', 'contact_url', 'full_name', 'full_title', 'first_name', 'last_name', 
-            'membership_type', 'membership_from', 'membership_start_date', 'party', 'gender',
-            'parliament_email', 'phone', 'fax', 'address_line1', 'address_line2', 'postcode',
-            'website', 'facebook', 'twitter', 'is_active'
-        ]
         
-        # Write header only if starting from beginning
-        if start_index == 0:
-            with open(csv_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
+        # Resume from an existing CSV unless refreshing from the beginning:
+        # Lords already written are skipped, so an interrupted run can simply
+        # be restarted. Refreshing from an offset re-scrapes the selected
+        # Lords, replacing their old rows rather than duplicating them
+        resume = (os.path.exists(csv_file) and os.path.getsize(csv_file) > 0
+                  and not (self.refresh and start_index == 0))
+        done = set()
+        if resume and self.refresh:
+            self.drop_rows(csv_file, {lord['member_id'] for lord in lords})
+        elif resume:
+            done = self.load_done_ids(csv_file)
         
-        for i, lord in enumerate(lords):
-            member_id = lord['member_id']
-            print(f"Processing Lord {start_index + i + 1}: {lord['full_name']} (ID: {member_id})")
-            
-            # Get contact information
-            contact_data = self.get_api_data(f'/api/Members/{member_id}/Contact')
-            contact_info = self.extract_contact_info(contact_data)
-            
-            # Get additional member details
-            member_data = self.get_api_data(f'/api/Members/{member_id}')
-            member_details = self.extract_member_details(member_data)
-            
-            # Debug output
-            if contact_info.get('parliament_email') and contact_info['parliament_email'] != 'contactholmember@parliament.uk':
-                print(f"    ✓ Personal email: {contact_info['parliament_email']}")
-            else:
-                print(f"    → Generic email or none")
-            
-            if contact_info.get('phone'):
-                print(f"    ✓ Phone: {contact_info['phone']}")
-            
-            # Create result record
-            result = {
-                'member_id': member_id,
-                'contact_url': f'https://members.parliament.uk/member/{member_id}/contact',
-                'full_name': lord['full_name'],
-                'full_title': member_details['full_title'],
-                'first_name': lord['first_name'],
-                'last_name': lord['last_name'],
-                'membership_type': member_details['membership_type'] or lord.get('membership_type', ''),
-                'membership_from': lord.get('membership_from', ''),
-                'membership_start_date': member_details['membership_start_date'],
-                'party': lord['party'],
-                'gender': member_details['gender'],
-                'parliament_email': contact_info.get('parliament_email', ''),
-                'phone': contact_info.get('phone', ''),
-                'fax': contact_info.get('fax', ''),
-                'address_line1': contact_info.get('address_line1', ''),
-                'address_line2': contact_info.get('address_line2', ''),
-                'postcode': contact_info.get('postcode', ''),
-                'website': contact_info.get('website', ''),
-                'facebook': contact_info.get('facebook', ''),
-                'twitter': contact_info.get('twitter', ''),
-                'is_active': member_details['is_active']
-            }
-            
-            # Append this row immediately to CSV
-            with open(csv_file, 'a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writerow(result)
-            
-            print(f"    Row {start_index + i + 1} written to {csv_file}")
+        # Keep each Lord's position in the cache for progress output
+        lords = [(start_index + i, lord) for i, lord in enumerate(lords) if lord['member_id'] not in done]
+        
+        if done:
+            print(f"Found {len(done)} Lords already in {csv_file}, skipping them")
+        print(f"Scraping contact details for {len(lords)} Lords starting from index {start_index}...")
+        
+        # Open the CSV once for the whole run: append when resuming, otherwise
+        # truncate and write the header
+        with open(csv_file, 'a' if resume else 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+            if not resume:
+                writer.writeheader()
             
-            time.sleep(1)  # Be respectful to the API
+            # Fetch Lords concurrently, but write rows in cache order. A Lord's
+            # contact and member details don't depend on each other, so both
+            # requests are in flight at once
+            executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            failed = 0
+            try:
+                pending = [
+                    (index, lord,
+                     executor.submit(self.get_api_data, CONTACT_ENDPOINT(lord['member_id'])),
+                     executor.submit(self.get_api_data, MEMBER_ENDPOINT(lord['member_id'])))
+                    for index, lord in lords
+                ]
+                
+                for index, lord, contact_future, member_future in pending:
+                    print(f"Processing Lord {index + 1}: {lord['full_name']} (ID: {lord['member_id']})")
+                    contact_data = contact_future.result()
+                    member_data = member_future.result()
+                    
+                    # Written Lords are skipped on the next run, so leave out
+                    # any whose details couldn't be fetched and let that run
+                    # retry them
+                    if contact_data is None or member_data is None:
+                        print(f"    ✗ Could not fetch details, will retry on the next run")
+                        failed += 1
+                        continue
+                    
+                    result = self.build_result(lord, contact_data, member_data)
+                    
+                    # Debug output
+                    if result['parliament_email'] and result['parliament_email'] != 'contactholmember@parliament.uk':
+                        print(f"    ✓ Personal email: {result['parliament_email']}")
+                    else:
+                        print(f"    → Generic email or none")
+                    
+                    if result['phone']:
+                        print(f"    ✓ Phone: {result['phone']}")
+                    
+                    # Flush each row so partial results survive an interruption
+                    writer.writerow(result)
+                    csvfile.flush()
+                    
+                    print(f"    Row {index + 1} written to {csv_file}")
+            finally:
+                # Drop queued Lords rather than fetching them all on Ctrl+C
+                executor.shutdown(cancel_futures=True)
         
+        if failed:
+            print(f"{failed} Lords could not be fetched and were not written, run again to retry them")
         print(f"All done! Results written to {csv_file}")
         return []  # No need to return anything since we're writing directly
-    
-    def save_progress(self, results, filename):
-        """Save progress to CSV - for compatibility"""
-        fieldnames = [
-            'member_id', 'contact_url', 'full_name', 'full_title', 'first_name', 'last_name', 
-            'membership_type', 'membership_from', 'membership_start_date', 'party', 'gender',
-            'parliament_email', 'phone', 'fax', 'address_line1', 'address_line2', 'postcode',
-            'website', 'facebook', 'twitter', 'is_active'
-        ]
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(results)
-        
-        print(f"Progress saved to {filename}")
 
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     start_index = 0
     max_lords = None  # Process ALL Lords by default
     
-    if len(sys.argv) > 1:
+    # --refresh ignores the HTTP cache and any Lords already written to
+    # uk_lords_complete.csv, and re-fetches every selected Lord (replacing
+    # their rows when starting from an offset)
+    refresh = '--refresh' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--refresh']
+    
+    if len(args) > 0:
         try:
-            start_index = int(sys.argv[1])
-            if len(sys.argv) > 2:
-                max_lords = int(sys.argv[2])
+            start_index = int(args[0])
+            if len(args) > 1:
+                max_lords = int(args[1])
                 if max_lords == -1:  # -1 means all
                     max_lords = None
         except ValueError:
-            print("Usage: python lords_contact_scraper.py [start_index] [max_lords]")
+            print("Usage: python scrape_lords.py [start_index] [max_lords] [--refresh]")
             print("Leave max_lords blank or use -1 to process all remaining Lords")
+            print("Lords already in uk_lords_complete.csv are skipped unless --refresh is given,")
+            print("which re-scrapes the selected Lords and replaces their rows")
             sys.exit(1)
     
     print(f"Starting from Lord index {start_index}, processing {'all remaining' if max_lords is None else max_lords} Lords")
     
-    scraper = LordsContactScraper()
+    scraper = LordsContactScraper(refresh=refresh)
     
     try:
         scraper.scrape_contacts(start_index, max_lords)
         print("Contact scraping completed!")
-            
+    
     except KeyboardInterrupt:
         print(f"\nInterrupted by user. Check uk_lords_complete.csv for partial results.")
     except Exception as e:
@@ -3,50 +3,44 @@
 Scrape contact details for MPs using the cached list
 """
 
-import requests
 import csv
-import time
+import logging
 import sys
 import os
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from members_api import MembersAPI, MAX_WORKERS, BUFFER_SIZE, CONTACT_ENDPOINT, CONTACT_URL, copy_fields
 
-class MPContactScraper:
-    def __init__(self):
-        self.base_url = "https://members-api.parliament.uk/api"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json',
-            'Accept-Language': 'en-GB,en;q=0.9'
-        })
-    
-    def get_api_data(self, endpoint, retries=3):
-        """Get data from API with retries and error handling"""
-        url = urljoin(self.base_url, endpoint)
-        
-        for attempt in range(retries):
-            try:
-                response = self.session.get(url, timeout=15)
-                
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 429:  # Rate limited
-                    print(f"Rate limited, waiting 30 seconds...")
-                    time.sleep(30)
-                    continue
-                else:
-                    print(f"API returned status {response.status_code} for {url}")
-                    if attempt < retries - 1:
-                        time.sleep(2)
-                        continue
-                    return None
-                    
-            except requests.RequestException as e:
-                print(f"Error fetching {url} (attempt {attempt + 1}): {e}")
-                if attempt < retries - 1:
-                    time.sleep(3)
-                else:
-                    return None
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = 'mps_cache.csv'
+
+FIELDNAMES = (
+    'member_id', 'contact_url', 'first_name', 'last_name', 'constituency_name', 'party',
+    'parliament_email', 'phone', 'constituency_email',
+    'website', 'facebook', 'twitter'
+)
+
+# Number of result rows written to the output CSV at a time
+WRITE_BATCH = 100
+
+# Log a progress line every this many MPs; per-MP details are logged at DEBUG
+PROGRESS_EVERY = 50
+
+# Contact handlers keyed by the API's contact type, lower-cased so casing
+# variants still match; websites and social media links are kept in line1
+CONTACT_HANDLERS = {
+    'parliamentary office': copy_fields(('email', 'parliament_email'), ('phone', 'phone')),
+    'constituency office': copy_fields(('email', 'constituency_email')),
+    'website': copy_fields(('line1', 'website')),
+    'facebook': copy_fields(('line1', 'facebook')),
+    'twitter': copy_fields(('line1', 'twitter')),
+    'x (formerly twitter)': copy_fields(('line1', 'twitter'))
+}
+
+class MPContactScraper(MembersAPI):
+    def __init__(self, max_workers=MAX_WORKERS, refresh=False):
+        super().__init__(max_workers=max_workers, cache_name='mps_http_cache', refresh=refresh)
     
     def extract_contact_info(self, contact_data):
         """Extract contact information from API response"""
@@ -69,191 +63,138 @@ class MPContactScraper:
         for contact in contacts:
             if not isinstance(contact, dict):
                 continue
-                
-            contact_type = contact.get('type', '').lower()
-            
-            if 'parliamentary office' in contact_type:
-                if contact.get('email'):
-                    contact_info['parliament_email'] = contact['email']
-                if contact.get('phone'):
-                    contact_info['phone'] = contact['phone']
-            
-            elif 'constituency office' in contact_type:
-                if contact.get('email'):
-                    contact_info['constituency_email'] = contact['email']
             
-            elif 'website' in contact_type:
-                if contact.get('line1'):
-                    contact_info['website'] = contact['line1']
-            
-            elif 'facebook' in contact_type:
-                if contact.get('line1'):
-                    contact_info['facebook'] = contact['line1']
-            
-            elif 'twitter' in contact_type or 'x (formerly twitter)' in contact_type:
-                if contact.get('line1'):
-                    contact_info['twitter'] = contact['line1']
+            handler = CONTACT_HANDLERS.get(contact.get('type', '').lower())
+            if handler:
+                handler(contact, contact_info)
         
         return contact_info
     
-    def load_cached_mps(self, cache_file='mps_cache.csv'):
-        """Load MPs from cache file"""
-        if not os.path.exists(cache_file):
-            print(f"Cache file {cache_file} not found. Run cache_mps_list.py first.")
-            return []
-        
-        mps = []
-        with open(cache_file, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                mps.append(row)
-        
-        print(f"Loaded {len(mps)} MPs from cache")
-        return mps
+    def iter_cached_mps(self, start_index=0, max_mps=None, cache_file=CACHE_FILE):
+        """Yield the requested slice of MPs from cache file as the rows are read"""
+        with open(cache_file, 'r', encoding='utf-8', buffering=BUFFER_SIZE) as csvfile:
+            # Only parse as far as the rows we need
+            stop = start_index + max_mps if max_mps else None
+            yield from islice(csv.DictReader(csvfile), start_index, stop)
+    
+    def scrape_mp(self, mp):
+        """Fetch an MP's contact details and build their result row (in FIELDNAMES order)"""
+        member_id = mp['member_id']
+        
+        # Get contact information
+        contact_data = self.get_api_data(CONTACT_ENDPOINT(member_id))
+        logger.debug("MP %s contact API response: %s", member_id, contact_data)
+        
+        contact_info = self.extract_contact_info(contact_data)
+        logger.debug("MP %s extracted contact info: %s", member_id, contact_info)
+        
+        return (
+            member_id,
+            CONTACT_URL(member_id),
+            mp['first_name'],
+            mp['last_name'],
+            mp['constituency_name'],
+            mp['party'],
+            contact_info['parliament_email'],
+            contact_info['phone'],
+            contact_info['constituency_email'],
+            contact_info['website'],
+            contact_info['facebook'],
+            contact_info['twitter']
+        )
     
     def scrape_contacts(self, start_index=0, max_mps=None):
         """Scrape contact details for cached MPs"""
-        mps = self.load_cached_mps()
-        if not mps:
+        if not os.path.exists(CACHE_FILE):
+            print(f"Cache file {CACHE_FILE} not found. Run cache_mps.py first.")
             return []
         
-        if max_mps:
-            mps = mps[start_index:start_index + max_mps]
-        else:
-            mps = mps[start_index:]
+        logger.info("Scraping contact details for MPs starting from index %d...", start_index)
         
-        print(f"Scraping contact details for {len(mps)} MPs starting from index {start_index}...")
-        
-        # Initialize the CSV file with headers (or append if continuing)
         csv_file = 'uk_mps_complete.csv'
-        fieldnames = [
-            'member_id', 'contact_url', 'first_name', 'last_name', 'constituency_name', 'party',
-            'parliament_email', 'phone', 'constituency_email',
-            'website', 'facebook', 'twitter'
-        ]
-        
-        # Write header only if starting from beginning
-        if start_index == 0:
-            with open(csv_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
         
-        for i, mp in enumerate(mps):
-            member_id = mp['member_id']
-            print(f"Processing MP {start_index + i + 1}: {mp['full_name']} (ID: {member_id})")
-            
-            # Get contact information
-            contact_data = self.get_api_data(f'/api/Members/{member_id}/Contact')
+        # Open the CSV once for the whole run, writing the header only if
+        # starting from the beginning
+        with open(csv_file, 'w' if start_index == 0 else 'a', newline='', encoding='utf-8', buffering=BUFFER_SIZE) as csvfile:
+            writer = csv.writer(csvfile)
+            if start_index == 0:
+                writer.writerow(FIELDNAMES)
             
-            # Debug: print what we got from the contact API
-            print(f"    Contact API response:")
-            if contact_data and 'value' in contact_data:
-                for contact in contact_data['value']:
-                    contact_type = contact.get('type', 'Unknown')
-                    email = contact.get('email', '')
-                    phone = contact.get('phone', '')
-                    line1 = contact.get('line1', '')
-                    print(f"      {contact_type}: email='{email}', phone='{phone}', line1='{line1}'")
-            else:
-                print(f"      No contact data returned")
-            
-            contact_info = self.extract_contact_info(contact_data)
-            
-            # Debug: print extracted contact info
-            print(f"    Extracted contact info:")
-            print(f"      Parliament email: '{contact_info.get('parliament_email', '')}'")
-            print(f"      Phone: '{contact_info.get('phone', '')}'")
-            print(f"      Constituency email: '{contact_info.get('constituency_email', '')}'")
-            print(f"      Website: '{contact_info.get('website', '')}'")
-            print(f"      Facebook: '{contact_info.get('facebook', '')}'")
-            print(f"      Twitter: '{contact_info.get('twitter', '')}'")
-            print()
-            
-            # Create result record
-            result = {
-                'member_id': member_id,
-                'contact_url': f'https://members.parliament.uk/member/{member_id}/contact',
-                'first_name': mp['first_name'],
-                'last_name': mp['last_name'],
-                'constituency_name': mp['constituency_name'],
-                'party': mp['party'],
-                'parliament_email': contact_info.get('parliament_email', ''),
-                'phone': contact_info.get('phone', ''),
-                'constituency_email': contact_info.get('constituency_email', ''),
-                'website': contact_info.get('website', ''),
-                'facebook': contact_info.get('facebook', ''),
-                'twitter': contact_info.get('twitter', '')
-            }
-            
-            # Append this row immediately to CSV
-            with open(csv_file, 'a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writerow(result)
-            
-            print(f"    Row {start_index + i + 1} written to {csv_file}")
-            
-            time.sleep(1)  # Be respectful
-        
-        print(f"All done! Results written to {csv_file}")
+            # Fetch and parse MPs in the worker threads, so this thread only
+            # has to write the finished rows out in cache order
+            executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            batch = []
+            try:
+                pending = []
+                for i, mp in enumerate(self.iter_cached_mps(start_index, max_mps)):
+                    # Don't waste a request on a cache row that can't succeed
+                    member_id = (mp.get('member_id') or '').strip()
+                    if not member_id.isdigit():
+                        logger.warning("Skipping MP %d with bad member ID: %r", start_index + i + 1, mp)
+                        continue
+                    
+                    mp['member_id'] = member_id
+                    pending.append((i, mp, executor.submit(self.scrape_mp, mp)))
+                logger.info("Queued %d MPs from cache", len(pending))
+                
+                for i, mp, result_future in pending:
+                    if (start_index + i) % PROGRESS_EVERY == 0:
+                        logger.info("Processing MP %d: %s (ID: %s)", start_index + i + 1, mp['full_name'], mp['member_id'])
+                    result = result_future.result()
+                    
+                    # Write rows in batches, flushing each so partial results
+                    # survive a crash
+                    batch.append(result)
+                    if len(batch) >= WRITE_BATCH:
+                        writer.writerows(batch)
+                        csvfile.flush()
+                        logger.debug("Rows up to %d written to %s", start_index + i + 1, csv_file)
+                        batch.clear()
+            finally:
+                # Drop queued MPs rather than fetching them all on Ctrl+C, but
+                # keep the rows already scraped
+                executor.shutdown(cancel_futures=True)
+                writer.writerows(batch)
+        
+        logger.info("All done! Results written to %s", csv_file)
         return []  # No need to return anything since we're writing directly
-    
-    def save_progress(self, results, filename):
-        """Save progress to CSV - ONLY the current batch"""
-        fieldnames = [
-            'member_id', 'contact_url', 'first_name', 'last_name', 'constituency_name', 'party',
-            'parliament_email', 'phone', 'constituency_email',
-            'website', 'facebook', 'twitter'
-        ]
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(results)
-        
-        print(f"Progress saved to {filename}")
-    
-    def save_batch_only(self, results, batch_start, filename):
-        """Save only the current batch, not all results"""
-        fieldnames = [
-            'member_id', 'contact_url', 'first_name', 'last_name', 'constituency_name', 'party',
-            'parliament_email', 'phone', 'constituency_email',
-            'website', 'facebook', 'twitter'
-        ]
-        
-        # Only save the last 10 results (current batch)
-        batch_results = results[-10:] if len(results) >= 10 else results
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(batch_results)
-        
-        print(f"Batch progress saved to {filename}")
-    
-    def save_final_results(self, results, filename='uk_mps_final.csv'):
-        """Save final results to CSV"""
-        self.save_progress(results, filename)
-        print(f"Final results saved to {filename}")
 
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     start_index = 0
     max_mps = None  # Process ALL MPs by default
+    max_workers = MAX_WORKERS
     
-    if len(sys.argv) > 1:
-        try:
-            start_index = int(sys.argv[1])
-            if len(sys.argv) > 2:
-                max_mps = int(sys.argv[2])
+    # --refresh ignores the HTTP cache and re-fetches every MP's contacts
+    refresh = '--refresh' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--refresh']
+    
+    try:
+        # --workers N sets how many MPs are fetched at once
+        if '--workers' in args:
+            i = args.index('--workers')
+            max_workers = int(args[i + 1])
+            if max_workers < 1:
+                raise ValueError(max_workers)
+            del args[i:i + 2]
+        
+        if len(args) > 0:
+            start_index = int(args[0])
+            if len(args) > 1:
+                max_mps = int(args[1])
                 if max_mps == -1:  # -1 means all
                     max_mps = None
-        except ValueError:
-            print("Usage: python contact_scraper.py [start_index] [max_mps]")
-            print("Leave max_mps blank or use -1 to process all remaining MPs")
-            sys.exit(1)
+    except (IndexError, ValueError):
+        print("Usage: python scrape_mps.py [start_index] [max_mps] [--workers N] [--refresh]")
+        print("Leave max_mps blank or use -1 to process all remaining MPs")
+        print(f"--workers sets how many MPs are fetched at once (default {MAX_WORKERS})")
+        print("Contact responses are cached for a day unless --refresh is given")
+        sys.exit(1)
     
     print(f"Starting from MP index {start_index}, processing {'all remaining' if max_mps is None else max_mps} MPs")
     
-    scraper = MPContactScraper()
+    scraper = MPContactScraper(max_workers=max_workers, refresh=refresh)
     
     try:
         scraper.scrape_contacts(start_index, max_mps)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Checks for the shared Members API client, run with python -m unittest
+"""
+
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from members_api import MembersAPI
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    """Answers every request with a 429 and a Retry-After header"""
+    requests_seen = 0
+    retry_after = '1'
+    
+    def do_GET(self):
+        type(self).requests_seen += 1
+        self.send_response(429)
+        self.send_header('Retry-After', self.retry_after)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+class GetApiDataTest(unittest.TestCase):
+    def setUp(self):
+        RateLimitedHandler.requests_seen = 0
+        RateLimitedHandler.retry_after = '1'
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RateLimitedHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+    
+    def make_api(self, **kwargs):
+        api = MembersAPI('Commons', **kwargs)
+        api.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        api.session.mount('http://', api.session.get_adapter('https://'))
+        return api
+    
+    def test_429_reaches_get_api_data_after_one_request(self):
+        api = self.make_api()
+        
+        with mock.patch('members_api.time') as fake_time:
+            sleep = fake_time.sleep
+            self.assertIsNone(api.get_api_data('/api/Members/1', retries=1))
+        
+        # urllib3 must not retry the 429 itself, get_api_data handles it, and
+        # there's no point waiting after the last attempt
+        self.assertEqual(RateLimitedHandler.requests_seen, 1)
+        sleep.assert_not_called()
+    
+    def test_429_waits_between_attempts_only(self):
+        api = self.make_api()
+        
+        with mock.patch('members_api.time') as fake_time:
+            sleep = fake_time.sleep
+            self.assertIsNone(api.get_api_data('/api/Members/1', retries=3))
+        
+        self.assertEqual(RateLimitedHandler.requests_seen, 3)
+        self.assertEqual(sleep.call_count, 2)
+    
+    def test_long_retry_after_is_clamped(self):
+        RateLimitedHandler.retry_after = '3600'
+        api = self.make_api()
+        
+        with mock.patch('members_api.time') as fake_time:
+            sleep = fake_time.sleep
+            self.assertIsNone(api.get_api_data('/api/Members/1', retries=2))
+        
+        # At most a minute (plus jitter) between attempts
+        self.assertEqual(RateLimitedHandler.requests_seen, 2)
+        (wait,), _ = sleep.call_args
+        self.assertLessEqual(wait, 61)
+    
+    def test_refresh_without_http_cache(self):
+        api = self.make_api(refresh=True)
+        
+        # A plain requests session must not be passed force_refresh
+        with mock.patch('members_api.time'):
+            self.assertIsNone(api.get_api_data('/api/Members/1', retries=1))
+        self.assertEqual(RateLimitedHandler.requests_seen, 1)
+
+class PaginateTest(unittest.TestCase):
+    def test_missing_total_is_not_complete(self):
+        api = MembersAPI('Commons')
+        page = {'items': [{'value': {'latestHouseMembership': {'membershipStatus': {'statusIsActive': True}}}}]}
+        
+        with mock.patch.object(api, 'get_search_page', return_value=page):
+            self.assertEqual(list(api._paginate()), [])
+        self.assertFalse(api.search_complete)
+
+if __name__ == "__main__":
+    unittest.main()